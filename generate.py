@@ -1,5 +1,6 @@
 import sys
-import copy
+
+from collections import Counter, deque
 
 from crossword import *
 
@@ -16,6 +17,23 @@ class CrosswordCreator():
             for var in self.crossword.variables
         }
 
+        #neighbours and overlaps of each variable, looked up once for the whole solve.
+        self.neighbors = {
+            var: frozenset(self.crossword.neighbors(var))
+            for var in self.crossword.variables
+        }
+        self.overlaps = dict(self.crossword.overlaps)
+
+        #number of neighbours of each variable, used to break ties between variables.
+        self.neighbor_count = {
+            var: len(self.neighbors[var])
+            for var in self.crossword.variables
+        }
+
+        #cache of the characters found at each overlap position of a domain,
+        #keyed by (variable, position) and tied to the domain set it was built from.
+        self._support_cache = {}
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -101,29 +119,12 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         
-        # create a deep copy of the domain dictionary to prevent modifications durring iteration.
-        domain_copy = copy.deepcopy(self.domains)
-        
-        # iterate over each variable in the domain copy.
-        for variable in domain_copy:
-            
-            # store the length of the variable.
-            variable_length = variable.length
-            
-            # iterate over each word in the domain copy of the variable
-            for word in domain_copy[variable]:
-                
-                # check if the length of the word is not equal to the variable length
-                if len (word) != variable_length:
-                    
-                    #if the lengths do not match, remove the word from the original domain.
-                    try:
-                        self.domains[variable].remove(word)
-                    except ValueError:
-                        #handle the exception when the word is not found in the list.
-                        print(f"word: '{word}' not found in domain of variable.")
-                    
-                    
+        #rebuild each domain keeping only words whose length matches the variable.
+        for variable, words in self.domains.items():
+            self.domains[variable] = {
+                word for word in words if len(word) == variable.length
+            }
+
     def revise(self, x, y):
         """
         Make variable `x` arc consistent with variable `y`.
@@ -135,39 +136,41 @@ class CrosswordCreator():
         """
         
         #identify overlap points between variable x and y in crossword puzzle.
-        xoverlap, yoverlap = self.crossword.overlaps[x, y]
+        xoverlap, yoverlap = self.overlaps[x, y]
         
-        #initialize revision flag as False.
-        revision_made = False
+        #a word of x is supported iff its overlap character appears in some word of y.
+        support_chars = self.support_chars(y, yoverlap)
+        survivors = {
+            xword for xword in self.domains[x]
+            if xword[xoverlap] in support_chars
+        }
         
-        #make a deep copy of the domains to prevent modifications during iteration.
-        domains_copy = copy.deepcopy(self.domains)
+        #a revision was made if any word of x had no match in y.
+        revision_made = len(survivors) != len(self.domains[x])
+        self.domains[x] = survivors
         
-        #if x and y overlap, check consistency for words in their domains.
-        if xoverlap:
-            
-            #iterate over each word in the domain of x.
-            for xword in domains_copy[x]:
-                
-                #flag to check if matching value is found in domain y.
-                match_value = False
-                
-                #iterate over each word in the domain of y.
-                for yword in self.domains[y]:
-                    
-                    #if the overlapping characters in both words match, set flag to True and break loop.
-                    if xword[xoverlap] == yword[yoverlap]: 
-                        match_value = True 
-                        break
-                    
-                #if no match is found, remove word from domain of x and set revision flag to True.
-                if not match_value:
-                    self.domains[x].remove(xword)
-                    revision_made = True
-                    
         #return True if a revision was made, False otherwise.
         return revision_made
 
+    def support_chars(self, var, position):
+        """
+        Return the set of characters found at `position` across the words
+        in `self.domains[var]`.
+
+        The result is cached until `self.domains[var]` is replaced.
+        """
+        
+        #reuse the cached characters if the domain has not been replaced since.
+        domain = self.domains[var]
+        cached = self._support_cache.get((var, position))
+        if cached is not None and cached[0] is domain:
+            return cached[1]
+        
+        #otherwise collect the characters and remember which domain they came from.
+        chars = {word[position] for word in domain}
+        self._support_cache[var, position] = (domain, chars)
+        return chars
+
     def ac3(self, arcs=None):
         """
         Update `self.domains` such that each variable is arc consistent.
@@ -178,37 +181,39 @@ class CrosswordCreator():
         return False if one or more domains end up empty.
         """
         
-        #initialize an empty queue if no specific arcs are provided.
-        if not arcs:
-            
-            #create a queue of arcs to revise.
-            queue = []
-            
-            #for each variable, add its arcs with neighbors to the queue.
-            for variable1 in self.domains:
-                for variable2 in self.crossword.neighbors(variable1):
-                    if self.crossword.overlaps[variable1, variable2] is not None:
-                        queue.append((variable1, variable2))
+        #begin with every arc in the problem if no specific arcs are provided.
+        if arcs is None:
+            arcs = [
+                (variable1, variable2)
+                for variable1 in self.domains
+                for variable2 in self.neighbors[variable1]
+            ]
+        
+        #queue the arcs to revise, tracking which are queued to avoid duplicates.
+        queue = deque(arcs)
+        in_queue = set(queue)
                         
         #process all arcs until queue is empty                 
         while queue:
-            #get the first arcs in the queue
-            x, y = queue.pop(0)
+            #get the first arc in the queue
+            x, y = queue.popleft()
+            in_queue.discard((x, y))
             
             #try to revise the arc x, y.
             if self.revise(x, y):
                 
                 #if domain of x is empty after revision, return False
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
                     return False
                 
-                #add arcs z, x for all neighbors z of x in the queue except y
-                for neighbour in self.crossword.neighbors(x):
-                    if neighbour != y:
+                #add arcs z, x for all neighbors z of x except y, unless already queued
+                for neighbour in self.neighbors[x]:
+                    if neighbour != y and (neighbour, x) not in in_queue:
                         queue.append((neighbour, x))
+                        in_queue.add((neighbour, x))
                         
-            #of all arcs processed and no inconsistency found return True.
-            return True
+        #if all arcs processed and no inconsistency found return True.
+        return True
 
     def assignment_complete(self, assignment):
         """
@@ -246,9 +251,9 @@ class CrosswordCreator():
             
         #check if the assigned words don't conflict at the overlap position.
         for variable in assignment:
-            for neighbour in self.crossword.neighbors(variable):
+            for neighbour in self.neighbors[variable]:
                 if neighbour in assignment:
-                    x, y = self.crossword.overlaps[variable, neighbour]
+                    x, y = self.overlaps[variable, neighbour]
                     
                     #if the overlapping characters of the assigned words don't match return False.
                     if assignment[variable][x] != assignment[neighbour][y]:
@@ -257,6 +262,28 @@ class CrosswordCreator():
         #if all assigned words are unique of correct length and don't conflict return True.
         return True
 
+    def consistent_with(self, var, word, assignment, assigned_words):
+        """
+        Return True if assigning `word` to `var` keeps the consistent
+        `assignment` consistent; return False otherwise.
+
+        `assigned_words` is the set of words already used in `assignment`.
+        Only the constraints involving `var` are checked.
+        """
+        
+        #the word must not already be used and must fit the variable
+        if word in assigned_words or len(word) != var.length:
+            return False
+        
+        #the word must agree with every assigned neighbour at their overlap
+        for neighbour in self.neighbors[var]:
+            if neighbour in assignment:
+                x, y = self.overlaps[var, neighbour]
+                if word[x] != assignment[neighbour][y]:
+                    return False
+        
+        return True
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
@@ -265,45 +292,30 @@ class CrosswordCreator():
         that rules out the fewest values among the neighbors of `var`.
         """
         
-        #initialize a dictionary to store words in the domain and
-        #their count of ruled out values
-        word_dict = {}
+        #fetch the unassigned neighbours of 'var' with their overlapping positions once.
+        neighbours = [
+            (neighbour, *self.overlaps[var, neighbour])
+            for neighbour in self.neighbors[var]
+            if neighbour not in assignment
+        ]
         
-        #fetch the neighbours of the variable 'var'
-        neighbours = self.crossword.neighbors(var)
+        #count each neighbour's words by the character at its overlap position,
+        #so a word rules out every neighbour value not sharing its character.
+        histograms = [
+            (xoverlap, len(self.domains[neighbour]),
+             Counter(word[yoverlap] for word in self.domains[neighbour]))
+            for neighbour, xoverlap, yoverlap in neighbours
+        ]
         
-        #iterate over each word in the domain of var
-        for word in self.domains[var]:
-            
-            #initialize count of ruled out values for word
-            eliminated = 0
-            
-            #iterate over each neighbour of var.
-            for neighbour in neighbours:
-                
-                #if the neighbour is already in the assignment skip to next neighbour
-                if neighbour in assignment:
-                    continue
-                else:
-                    #fetch the overlapping positions of var and neighbour.
-                    xoverlap, yoverlap = self.crossword.overlaps[var, neighbour]
-                    
-                    #iterate over each word in the domain of neighbour.
-                    for neighbour_word in self.domains[neighbour]:
-                        
-                        #if overlapping characters of word and neighbour_word 
-                        #dont match increment eliminated count
-                        if word[xoverlap] != neighbour_word[yoverlap]:
-                            eliminated += 1
-                            
-            #update the eliminated count for word in the dictionary
-            word_dict[word] = eliminated
-            
-        #sort the dictionary by the eliminated count in ascending order
-        sorted_dict = dict(sorted(word.dict.items(), key=lambda item: item[1]))
+        def eliminated(word):
+            """Count the neighbouring values that `word` would rule out."""
+            return sum(
+                size - histogram[word[xoverlap]]
+                for xoverlap, size, histogram in histograms
+            )
         
-        #return the words in the sorted order
-        return [*sorted_dict]
+        #return the words sorted by their eliminated count in ascending order
+        return sorted(self.domains[var], key=eliminated)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -314,28 +326,24 @@ class CrosswordCreator():
         return values.
         """
         
-        #initialize a dictionary to store unassigned variables and their domains
-        choice_dict = {}
-        
-        #iterate over each variable in the domains
-        for variable in self.domains:
-            
-            #if the variable is not assigned, add it to the choice_dict
-            if variable not in assignment:
-                choice_dict[variable] = self.domains[variable]
-                
-        #sort the dictionary by the size of each variable's domain
-        sorted_list = [v for v, k in sorted(choice_dict.items(), key = lambda item: len(item[1]))]
-        
-        #return the variable with the smallest domain
-        return sorted_list[0]
+        #pick the unassigned variable with the smallest domain,
+        #breaking ties in favour of the one with the most neighbours
+        return min(
+            (variable for variable in self.domains if variable not in assignment),
+            key=lambda variable: (
+                len(self.domains[variable]), -self.neighbor_count[variable]
+            )
+        )
 
-    def backtrack(self, assignment):
+    def backtrack(self, assignment, assigned_words=None):
         """
         Using Backtracking Search, take as input a partial assignment for the
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        It is extended in place while searching and restored on failure.
+        `assigned_words` is the set of words already used in `assignment`;
+        it is derived from `assignment` if not given.
 
         If no assignment is possible, return None.
         """
@@ -344,29 +352,53 @@ class CrosswordCreator():
         if len(assignment) == len(self.domains):
             return assignment
         
+        #collect the words already in use if the caller did not pass them down
+        if assigned_words is None:
+            assigned_words = set(assignment.values())
+        
         #select an unassigned variable
         variable = self.select_unassigned_variable(assignment)
         
-        #iterate over each value in the domain of the selected variable
-        for value in self.domains[variable]:
+        #domains are replaced rather than modified in place,
+        #so a shallow copy is enough to undo any inferences
+        saved_domains = self.domains.copy()
+        
+        #iterate over the values of the selected variable, least constraining first
+        for value in self.order_domain_values(variable, assignment):
             
-            #copy the current assignment and assign the selected value to 
-            # the variable in the copy
-            assignment_copy = assignment.copy()
-            assignment_copy[variable] = value
+            #skip values that conflict with the variables assigned so far
+            if not self.consistent_with(variable, value, assignment, assigned_words):
+                continue
             
-            #if the new assignment is consistent, recursively continue to assign the next variable
-            if self.consistent(assignment_copy):
-                result = self.backtrack(assignment_copy)
+            #restrict the variable to the value and propagate to its unassigned neighbours
+            self.domains[variable] = {value}
+            arcs = [
+                (neighbour, variable)
+                for neighbour in self.neighbors[variable]
+                if neighbour not in assignment
+            ]
+            if self.ac3(arcs):
+                
+                #assign the value in place and recursively continue to assign the next variable
+                assignment[variable] = value
+                assigned_words.add(value)
+                result = self.backtrack(assignment, assigned_words)
                 
                 #if a complete assignment is found return it 
                 if result is not None:
                     return result
                 
+                #otherwise take the value back out of the assignment
+                del assignment[variable]
+                assigned_words.discard(value)
+            
+            #undo the inferences made for this value
+            self.domains = saved_domains.copy()
+                
         #if no valid assignment is found after trying all values 
         #in domain return None
         return None
-                    
+
 def main():
 
     # Check usage
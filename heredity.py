@@ -1,7 +1,8 @@
 import csv
-import itertools
 import sys
 
+import numpy as np
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,6 +37,24 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Lookup tables of PROBS indexed by gene count (and trait, as 0 or 1)
+GENE = np.array([PROBS["gene"][gene] for gene in range(3)])
+TRAIT = np.array([
+    [PROBS["trait"][gene][False], PROBS["trait"][gene][True]]
+    for gene in range(3)
+])
+
+# Probability that a parent with a given gene count passes the gene on
+PASS = np.array([PROBS["mutation"], 0.5, 1 - PROBS["mutation"]])
+
+# Probability of a child having each gene count, indexed by the gene counts
+# of its mother and father and then the child's own gene count
+INHERIT = np.stack([
+    (1 - PASS[:, None]) * (1 - PASS[None, :]),
+    (1 - PASS[:, None]) * PASS[None, :] + PASS[:, None] * (1 - PASS[None, :]),
+    PASS[:, None] * PASS[None, :]
+], axis=-1)
+
 
 def main():
 
@@ -60,26 +79,37 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Describe the family by position once
+    index, mothers, fathers = family_arrays(people)
+    n = len(index)
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+    # Every combination of gene counts at once, one row per combination
+    # (row k holds the base 3 digits of k, one digit per person)
+    genes = np.arange(3 ** n)[:, None] // 3 ** np.arange(n) % 3
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+    # Mark which traits are possible for each person given the known information
+    allowed = np.ones((n, 2), dtype=bool)
+    for person, i in index.items():
+        if people[person]["trait"] is not None:
+            allowed[i, int(not people[person]["trait"])] = False
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    # Each person's trait depends only on their own gene count, so summing over
+    # all sets of people who might have the trait is a product of sums per person
+    traits = TRAIT * allowed[:, None, :]
+    evidence = traits.sum(axis=2)
+
+    # Joint probability of each combination of gene counts with the evidence
+    p = gene_factors(genes, mothers, fathers) * (
+        evidence[np.arange(n), genes].prod(axis=1)
+    )
+
+    # Total the probabilities by each person's gene count, then split every
+    # gene count's total between the traits in proportion to their probability
+    for person, i in index.items():
+        gene = np.bincount(genes[:, i], weights=p, minlength=3)
+        trait = gene @ (traits[i] / evidence[i][:, None])
+        probabilities[person]["gene"].update(enumerate(gene.tolist()))
+        probabilities[person]["trait"].update(zip((False, True), trait.tolist()))
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
@@ -116,19 +146,30 @@ def load_data(filename):
     return data
 
 
-def powerset(s):
+def family_arrays(people):
     """
-    Return a list of all possible subsets of set s.
+    Describe the family in `people` by position.
+
+    Return a tuple `(index, mothers, fathers)`, where `index` maps each
+    person's name to their position, and `mothers` and `fathers` are tuples
+    holding the position of each person's mother and father, or -1 where
+    that parent is unknown.
     """
-    s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    index = {person: i for i, person in enumerate(people)}
+    mothers = tuple(
+        index[people[person]["mother"]]
+        if people[person]["mother"] is not None else -1
+        for person in people
+    )
+    fathers = tuple(
+        index[people[person]["father"]]
+        if people[person]["father"] is not None else -1
+        for person in people
+    )
+    return index, mothers, fathers
 
 
-def joint_probability(people, one_gene, two_genes, have_trait):
+def joint_probability(people, one_gene, two_genes, have_trait, family=None):
     """
     Compute and return a joint probability.
 
@@ -138,50 +179,53 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone not in `one_gene` or `two_gene` does not have the gene, and
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
+
+    `family` is the result of `family_arrays(people)`; it is computed
+    from `people` if not given.
     """
-    
-    joint_probability = 1
-    for person in people:
-        #Calculate how many copies of the gene this person has
-        gene_count = 1 if person in one_gene else 2 if person in two_genes else 0
+    if family is None:
+        family = family_arrays(people)
+    index, mothers, fathers = family
+
+    #Gene count and trait (as 0 or 1) of every person, as a single row by position
+    genes = np.array([[
+        1 if person in one_gene else 2 if person in two_genes else 0
+        for person in index
+    ]])
+    traits = np.array([[int(person in have_trait) for person in index]])
 
-        #Check if the person has the trait or not
-        trait = person in have_trait
-
-        #Calculate gene and trait probabilities
-        gene_probability = PROBS['gene'][gene_count]
-        trait_probability = PROBS['trait'][gene_count][trait]
-        
-        #If person has no parents info, calculate joint probability as gene_probability * trait_probability
-        #Otherwise calculate it considering the parents' genes
-        if people[person]['mother'] is None:
-            joint_probability *= gene_probability * trait_probability 
+    return float(gene_factors(genes, mothers, fathers)[0]
+                 * trait_factors(genes, traits)[0])
+
+
+def gene_factors(genes, mothers, fathers):
+    """
+    Return the probability of each row of gene counts in `genes`, a 2D array
+    with one column per person by position. `mothers` and `fathers` are as
+    returned by `family_arrays`.
+    """
+    p = np.ones(len(genes))
+    for i in range(genes.shape[1]):
+
+        #People without a known mother use the unconditional gene probability,
+        #everyone else the probability of inheriting it from their parents,
+        #where an unknown father passes the gene on as if he had no copies
+        if mothers[i] < 0:
+            p *= GENE[genes[:, i]]
         else:
-            #Get the parents' info
-            mother = people[person]['mother']
-            father = people[person]['father']
-            
-            #Create a dictionary to store the probabilities of each parent passing the gene
-            parental_gene_probs = {}
-            
-            #Calculate the probabilities of each parent passing their gene
-            for parent in [mother, father]:
-                parent_gene_count = 1 if parent in one_gene else 2 if parent in two_genes else 0
-                parental_gene_probs[parent] = 0.5 if parent_gene_count == 1 else PROBS['mutation'] if parent_gene_count == 0 else 1 - PROBS['mutation']
-
-            #Calculate the joint probability considering the parents' genes
-            if gene_count == 0:
-                joint_probability *= (1 - parental_gene_probs[mother]) * (1 - parental_gene_probs[father])
-            elif gene_count == 1:
-                joint_probability *= (1 - parental_gene_probs[mother]) * parental_gene_probs[father] + parental_gene_probs[mother] * (1 - parental_gene_probs[father])
-            else:
-                joint_probability *= parental_gene_probs[mother] * parental_gene_probs[father]
-                
-            #Multiply joint probability with the trait probability
-            joint_probability *= trait_probability
-            
-    return joint_probability
-        
+            father = genes[:, fathers[i]] if fathers[i] >= 0 else 0
+            p *= INHERIT[genes[:, mothers[i]], father, genes[:, i]]
+    return p
+
+
+def trait_factors(genes, traits):
+    """
+    Return the probability of each row of traits (as 0 or 1) in `traits`,
+    given the matching row of gene counts in `genes`.
+    """
+    return TRAIT[genes, traits].prod(axis=1)
+
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
     Add to `probabilities` a new joint probability `p`.
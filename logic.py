@@ -1,3 +1,4 @@
+import functools
 import itertools
 
 
@@ -261,3 +262,55 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def model_check_all(knowledge, queries):
+    """Returns the queries entailed by knowledge base, enumerating models once."""
+
+    # Get all symbols in knowledge and queries, in a canonical order
+    symbols = tuple(sorted(set.union(
+        knowledge.symbols(), *(query.symbols() for query in queries)
+    )))
+
+    # Evaluate knowledge and each query in every model at once as truth tables;
+    # a query is entailed if it is true in every model where knowledge is true
+    knowledge_models = truth_table(knowledge, symbols)
+    return [
+        query for query in queries
+        if not knowledge_models & ~truth_table(query, symbols)
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def truth_table(sentence, symbols):
+    """
+    Returns the truth table of the logical sentence as an integer: bit m is
+    the sentence's value in model m, in which symbols[i] has the value of
+    bit i of m. Each connective is then a single bitwise operation over all
+    models at once. Results are cached, so sub-sentences shared between
+    (equal) knowledge bases are only evaluated once.
+    """
+    models = 2 ** len(symbols)
+    everything = (1 << models) - 1
+    if isinstance(sentence, Symbol):
+        i = symbols.index(sentence.name)
+        return sum(1 << m for m in range(models) if m >> i & 1)
+    if isinstance(sentence, Not):
+        return everything & ~truth_table(sentence.operand, symbols)
+    if isinstance(sentence, And):
+        table = everything
+        for conjunct in sentence.conjuncts:
+            table &= truth_table(conjunct, symbols)
+        return table
+    if isinstance(sentence, Or):
+        table = 0
+        for disjunct in sentence.disjuncts:
+            table |= truth_table(disjunct, symbols)
+        return table
+    if isinstance(sentence, Implication):
+        return ((everything & ~truth_table(sentence.antecedent, symbols))
+                | truth_table(sentence.consequent, symbols))
+    if isinstance(sentence, Biconditional):
+        return everything & ~(truth_table(sentence.left, symbols)
+                              ^ truth_table(sentence.right, symbols))
+    raise Exception("nothing to evaluate")
@@ -1,11 +1,20 @@
+import itertools
 import os
 import random
 import re
 import sys
 
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Matches the target of each link in an HTML page
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", re.IGNORECASE)
+
 
 def main():
     if len(sys.argv) != 2:
@@ -29,14 +38,20 @@ def crawl(directory):
     """
     pages = dict()
 
+    # Find the HTML files, then read them concurrently since this is I/O bound
+    with os.scandir(directory) as entries:
+        paths = {
+            entry.name: entry.path
+            for entry in entries
+            if entry.name.endswith(".html")
+        }
+    with ThreadPoolExecutor() as executor:
+        contents = executor.map(read_page, paths.values())
+
     # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    for filename, page in zip(paths, contents):
+        links = LINK_PATTERN.findall(page)
+        pages[filename] = set(links) - {filename}
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -48,6 +63,14 @@ def crawl(directory):
     return pages
 
 
+def read_page(path):
+    """
+    Return the contents of the HTML page at `path`.
+    """
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -58,40 +81,22 @@ def transition_model(corpus, page, damping_factor):
     a link at random chosen from all pages in the corpus.
     """
     
-    #Initialize dictionary to hold the probability distribution.
-    prop_dist = {}
-
-        #calculate number of pages in corpus and number of links on current page.
-    dict_len = len(corpus)
-    pages_len = len(corpus[page])
-
-    #if there are no links on current page.
-    if pages_len < 1:
-            
-        #Probability of transitioning to any page is equally likely
-        for key in corpus:
-            prop_dist[key] = 1 / dict_len
-
-    else:
-        #Otherwise, calculate two factors:
-        #random_factor is the probability of jumping to a page not linked from the current one.
-        #even_factor is the probability of following a link on the current page.
-        random_factor = (1-damping_factor) / dict_len
-        even_factor = damping_factor / pages_len
-    
-        #each page in corpus.
-        for key in corpus:
-            #if page is not linked from current page.
-            if key not in corpus[page]:
-                #Probability of transitioning to it is just the 'random_factor'.
-                prop_dist[key] = random_factor 
-            else:
-                #if the page is linked from current page.
-                #Probability of transitioning to it is the sum of even_factor and random_factor.
-                prop_dist[key] = even_factor + random_factor
-
-    #return the probability dispersal. 
-    return prop_dist
+    #calculate number of pages in corpus and fetch the links on current page.
+    pages_number = len(corpus)
+    links = corpus[page]
+
+    #if there are no links on current page, every page is equally likely.
+    if not links:
+        return {key: 1 / pages_number for key in corpus}
+
+    #otherwise every page gets the random jump probability,
+    #and linked pages additionally share the damping factor evenly.
+    random_factor = (1 - damping_factor) / pages_number
+    even_factor = damping_factor / len(links)
+    return {
+        key: random_factor + even_factor if key in links else random_factor
+        for key in corpus
+    }
     
 
 def sample_pagerank(corpus, damping_factor, n):
@@ -109,22 +114,27 @@ def sample_pagerank(corpus, damping_factor, n):
     samples_dict = corpus.copy()
     for i in samples_dict:
         samples_dict[i] = 0
-    sample = None
+
+    #Build each page's transition model once, as a list of pages and their
+    #cumulative probabilities, instead of rebuilding it on every step.
+    pages = list(corpus)
+    cumulative = {
+        page: list(itertools.accumulate(
+            transition_model(corpus, page, damping_factor).values()
+        ))
+        for page in corpus
+    }
+
+    #If not currently on page i.e., at the begining
+    #choose a page at random to start from.
+    sample = random.choice(pages)
 
     #Perform 'n' steps of the simulation.
-    for _ in range(n):
-        if sample:
+    for step in range(n):
+        if step:
             #If currently on a page
-            #decide the next page to visit based on the transition model.
-            dist = transition_model(corpus, sample, damping_factor)
-            dist_lst = list(dist.keys())
-            dist_weights = [dist[i] for i in dist]
-            #choose next page based on the probabilities.
-            sample = random.choices(dist_lst, dist_weights, k=1)[0]
-        else:
-            #If not currently on page i.e., at the begining
-            #choose a page at random to start from.
-            sample = random.choice(list(corpus.keys()))
+            #choose next page based on the probabilities of its transition model.
+            sample = random.choices(pages, cum_weights=cumulative[sample])[0]
 
         #Increment the count of visits to the current page.
         samples_dict[sample] += 1
@@ -148,45 +158,47 @@ def iterate_pagerank(corpus, damping_factor):
     PageRank values should sum to 1.
     """
     
-    #calculate total number of pages in corpus.
-    pages_number = len(corpus)
-    #initialize dictionaries to hold and rank values of each page.
-    old_dict = {page: 1 / pages_number for page in corpus}
-    new_dict = {}
+    #calculate total number of pages in corpus and give each page an index.
+    pages = list(corpus)
+    pages_number = len(pages)
+    index = {page: i for i, page in enumerate(pages)}
+
+    #build a sparse link matrix: column i holds the probability of following
+    #each link out of page i. Pages with no links are kept aside, since they
+    #link to every page and would fill whole columns.
+    rows = []
+    columns = []
+    probabilities = []
+    for i, page in enumerate(pages):
+        for linked_page in corpus[page]:
+            rows.append(index[linked_page])
+            columns.append(i)
+            probabilities.append(1 / len(corpus[page]))
+    links = csr_matrix(
+        (probabilities, (rows, columns)), shape=(pages_number, pages_number)
+    )
+    no_links = np.array([not corpus[page] for page in pages])
+
+    #start with every page equally ranked.
+    old_ranks = np.full(pages_number, 1 / pages_number)
 
     #Repeat the iteration until convergence.
     while True:
-        #for each page in corpus.
-        for page in corpus:
-            #initialize a variable to accumulate the rank values of linking pages.
-            temp = 0
-            #for each potential linking page in corpus
-            for linking_page in corpus:
-                #if the current page is linked from the linking page.
-                if page in corpus[linking_page]:
-                    #Add the rank value of the linking page divided by its number of links
-                    temp += (old_dict[linking_page] / len(corpus[linking_page]))
-                #if the linking page has no outgoing links.
-                if len (corpus[linking_page]) == 0:
-                    #treat it as if it links to all pages in the corpus and add its rank value divided by the total number of pages.
-                    temp += (old_dict[linking_page]) / pages_number
-
-            #apply the damping factor and add the constant term to the accumulated rank value to get the new rank value.
-            temp = damping_factor * temp + (1 - damping_factor) / pages_number
-            #store new rank value in new dictionary.
-            new_dict[page] = temp
-
-        #calculate maximum difference between the old and new rank values 
-        difference = max(abs(new_dict[x] - old_dict[x]) for x in old_dict)
+        #sum the rank flowing in through links, plus the rank of pages
+        #with no links spread evenly over every page.
+        incoming = links @ old_ranks + old_ranks[no_links].sum() / pages_number
+
+        #apply the damping factor and add the constant term to get the new rank values.
+        new_ranks = damping_factor * incoming + (1 - damping_factor) / pages_number
+
         #if maximum difference is below the threshold, the ranks have converged and we break the loop.
-        if difference < 0.001:
+        if np.abs(new_ranks - old_ranks).max() < 0.001:
             break
-        else:
-            #otherwise, update the old rank values to be the new ones and repeat the iteration.
-            old_dict = new_dict.copy()
+        #otherwise, update the old rank values to be the new ones and repeat the iteration.
+        old_ranks = new_ranks
 
     #after convergence, return final rank values as result.
-    return old_dict
+    return {page: float(new_ranks[index[page]]) for page in pages}
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
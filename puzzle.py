@@ -88,9 +88,8 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
-                    print(f"    {symbol}")
+            for symbol in model_check_all(knowledge, symbols):
+                print(f"    {symbol}")
 
 
 if __name__ == "__main__":
@@ -1,16 +1,25 @@
 import nltk
 import sys
 import os 
-import string
+import re
 import math
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from collections import defaultdict, Counter
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
 
 
 FILE_MATCHES = 1
 SENTENCE_MATCHES = 1
 
+# Words to drop while tokenizing, loaded once as a set for fast lookups
+STOPWORDS = frozenset(stopwords.words("english"))
+
+# Matches a word, optionally followed by an apostrophe suffix like "'s"
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)?")
+
 
 def main():
 
@@ -18,19 +27,21 @@ def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python questions.py corpus")
 
-    # Calculate IDF values across files
+    # Tokenize each file
     files = load_files(sys.argv[1])
     file_words = {
         filename: tokenize(files[filename])
         for filename in files
     }
-    file_idfs = compute_idfs(file_words)
+
+    # Index the files once, computing IDF values across files
+    file_index = index_documents(file_words)
 
     # Prompt user for query
     query = set(tokenize(input("Query: ")))
 
     # Determine top file matches according to TF-IDF
-    filenames = top_files(query, file_words, file_idfs, n=FILE_MATCHES)
+    filenames = top_files(query, file_index, file_index["idfs"], n=FILE_MATCHES)
 
     # Extract sentences from top files
     sentences = dict()
@@ -41,11 +52,13 @@ def main():
                 if tokens:
                     sentences[sentence] = tokens
 
-    # Compute IDF values across sentences
-    idfs = compute_idfs(sentences)
+    # Index the sentences once, computing IDF values across sentences
+    sentence_index = index_documents(sentences)
 
     # Determine top sentence matches
-    matches = top_sentences(query, sentences, idfs, n=SENTENCE_MATCHES)
+    matches = top_sentences(
+        query, sentence_index, sentence_index["idfs"], n=SENTENCE_MATCHES
+    )
     for match in matches:
         print(match)
 
@@ -56,24 +69,29 @@ def load_files(directory):
     `.txt` file inside that directory to the file's contents as a string.
     """
     
-    # Initialize an empty dictionary to hold our files and their contents
-    files = {}
-    
-    # Loop through each file in the specified directory
-    for filename in os.listdir(directory):
-        
-        # If the file ends with ".txt", it's a text file
-        if filename.endswith(".txt"):
-            
-            # Open the file in 'read' mode. The os.path.join() function is used to create the full file path
-            with open(os.path.join(directory, filename), "r") as file:
-                
-                # Read the file's contents and add it to our dictionary
-                # The key is the filename and the value is the file's contents
-                files[filename] = file.read()
-    
-    # Return the dictionary containing our files and their contents
-    return files
+    # Map each ".txt" file in the specified directory to its full path,
+    # which os.scandir() entries already carry
+    with os.scandir(directory) as entries:
+        paths = {
+            entry.name: entry.path
+            for entry in entries
+            if entry.name.endswith(".txt")
+        }
+
+    # Read the files concurrently, since waiting on the disk releases the GIL
+    with ThreadPoolExecutor() as executor:
+        contents = executor.map(read_file, paths.values())
+
+    # Return a dictionary where the key is the filename and the value is the file's contents
+    return dict(zip(paths, contents))
+
+
+def read_file(path):
+    """
+    Return the contents of the text file at `path`.
+    """
+    with open(path, "r") as file:
+        return file.read()
 
 
 def tokenize(document):
@@ -85,16 +103,13 @@ def tokenize(document):
     punctuation or English stopwords.
     """
     
-    # The nltk function word_tokenize() breaks up the string into words and punctuation
-    words = word_tokenize(document.lower())
+    # Find the words with a regular expression compiled once at module load;
+    # it never matches punctuation, so only stopwords need to be filtered out
+    words = WORD_PATTERN.findall(document.lower())
     
-    # List comprehension: compile a fresh list of items that
-    # just the words that are not stopwords or punctuation string with a 
-    # A pre-initialized string called "punctuation" contains all of the standard punctuation marks.
-    # A list of frequently used English terms with little significance may be found by using the query 
-    # stopwords.words("english").Prior to Natural Language Processing, 
-    # and are frequently eliminated.
-    words = [word for word in words if word not in string.punctuation and word not in stopwords.words("english")]
+    # List comprehension: compile a fresh list of just the words that are not
+    # English stopwords, looked up in the set built once at module load
+    words = [word for word in words if word not in STOPWORDS]
     
     # Return the list of words
     return words
@@ -109,87 +124,183 @@ def compute_idfs(documents):
     resulting dictionary.
     """
     
-    # Create an empty dictionary to hold the IDF values for each word.
-    idfs = dict()
+    # Count the number of documents containing each word, counting every
+    # document once per distinct word it contains
+    document_frequencies = Counter()
+    for words in documents.values():
+        document_frequencies.update(set(words))
 
     # Calculate the total number of documents
     num_documents = len(documents)
 
-    # Use a set comprehension to get a list of all unique words across all documents
-    words = set(word for sublist in documents.values() for word in sublist)
-    
-    # Loop through each unique word
-    for word in words:
-        # For each word, count the number of documents that contain the word
-        f = sum(word in documents[title] for title in documents)
-        
-        # Calculate the IDF value for the word
-        idf = math.log(num_documents / f)
-        
-        # Add the word and its IDF value to the idfs dictionary
-        idfs[word] = idf
-        
-    # Return the idfs dictionary
-    return idfs
+    # Calculate the IDF value for each word and return them in a dictionary
+    return {
+        word: math.log(num_documents / f)
+        for word, f in document_frequencies.items()
+    }
+
+
+def presence_idfs(vocabulary, presence):
+    """
+    Given a `vocabulary` mapping words to columns and a sparse `presence`
+    matrix with 1 wherever a word appears in a document, return a dictionary
+    that maps words to their IDF values, as `compute_idfs` would.
+    """
+
+    # Count the number of documents containing each word, as the column sums
+    # of the presence matrix
+    document_frequencies = np.asarray(presence.sum(axis=0)).ravel()
+
+    # Calculate the total number of documents
+    num_documents = presence.shape[0]
+
+    # Calculate the IDF value for each word and return them in a dictionary
+    return {
+        word: math.log(num_documents / f)
+        for word, f in zip(vocabulary, document_frequencies.tolist())
+    }
+
+
+def flatten(documents):
+    """
+    Given a dictionary of `documents` that maps names of documents to a list
+    of words, return a tuple `(vocabulary, columns, offsets)`: a dictionary
+    mapping each word to an id, the ids of every document's words in one
+    array, and the offset in that array where each document starts.
+    """
+
+    # Give every word an id the first time it is seen
+    vocabulary = {}
+    columns = []
+    offsets = [0]
+    for words in documents.values():
+        columns.extend(vocabulary.setdefault(word, len(vocabulary)) for word in words)
+        offsets.append(len(columns))
+
+    return (
+        vocabulary,
+        np.array(columns, dtype=np.int32),
+        np.array(offsets, dtype=np.int32)
+    )
+
+
+def index_documents(documents):
+    """
+    Given a dictionary of `documents` that maps names of documents to a list
+    of words, return an index of everything the rankings need, so each
+    document is tokenized and counted once however often it is scored:
+
+    - "names": the document names, in row order
+    - "vocabulary": a dictionary mapping each word to its column
+    - "counts": a sparse CSR matrix of how many times each word appears in
+      each document
+    - "presence": the same matrix with 1 wherever a word appears at all
+    - "lengths": an array of the number of words in each document
+    - "idfs": a dictionary mapping words to their IDF values
+    """
+
+    # Each word's id is its column, and each document's offset starts its row
+    vocabulary, columns, offsets = flatten(documents)
+    lengths = np.diff(offsets)
+
+    # Every occurrence counts once; summing duplicates merges repeated words
+    # (in place, reusing the flattened arrays, so they are not used after this)
+    counts = csr_matrix(
+        (np.ones(len(columns)), columns, offsets),
+        shape=(len(documents), len(vocabulary))
+    )
+    counts.sum_duplicates()
+    presence = counts.sign()
+
+    return {
+        "names": list(documents),
+        "vocabulary": vocabulary,
+        "counts": counts,
+        "presence": presence,
+        "lengths": lengths,
+        "idfs": presence_idfs(vocabulary, presence)
+    }
 
 
 def top_files(query, files, idfs, n):
     """
-    Given a `query` (a set of words), `files` (a dictionary mapping names of
-    files to a list of their words), and `idfs` (a dictionary mapping words
-    to their IDF values), return a list of the filenames of the the `n` top
+    Given a `query` (a set of words), `files` (an index of the files, as
+    returned by `index_documents`), and `idfs` (a dictionary mapping words to
+    their IDF values), return a list of the filenames of the the `n` top
     files that match the query, ranked according to tf-idf.
     """
-    
-    # Create a defaultdict of type float, this will automatically assign 0.0 as default value for non-existent keys.
-    tf_idfs = defaultdict(float)
-    
-    # Iterate through each word in the query
-    for word in query:
-        # If the word is present in the idfs dictionary (meaning it is in at least one of the documents)
-        if word in idfs:
-            # Then iterate through each file in the files dictionary
-            for file in files:
-                # Add the tf-idf score of the word for the current file to the total tf-idf score for this file.
-                # The tf-idf score for a word in a file is calculated as the frequency of the word in the file times the idf of the word
-                tf_idfs[file] += files[file].count(word) * idfs[word]
-                
-    # Sort the files by their tf-idf scores, in descending order
-    sorted_files = sorted(tf_idfs.items(), key=lambda x: x[1], reverse=True)
-    
-    # Return the filenames of the top n files
+
+    vocabulary = files["vocabulary"]
+
+    # Only query words present in the documents contribute to any score
+    words = [word for word in query if word in vocabulary and word in idfs]
+    if not words:
+        return []
+
+    # Weight each query word's column by its idf, leaving every other column at zero
+    weights = np.zeros(len(vocabulary))
+    for word in words:
+        weights[vocabulary[word]] = idfs[word]
+
+    # The tf-idf score of every file at once: each word's frequency in the file
+    # times its idf, summed by a single sparse matrix-vector product
+    scores = files["counts"] @ weights
+
+    # Rank the files by their tf-idf scores, in descending order
     # Note that if there are fewer than n files, this will simply return all files
-    return [file[0] for file in sorted_files[:n]]
+    return [files["names"][i] for i in top_indices(n, scores)]
 
 
 def top_sentences(query, sentences, idfs, n):
     """
-    Given a `query` (a set of words), `sentences` (a dictionary mapping
-    sentences to a list of their words), and `idfs` (a dictionary mapping words
+    Given a `query` (a set of words), `sentences` (an index of the sentences,
+    as returned by `index_documents`), and `idfs` (a dictionary mapping words
     to their IDF values), return a list of the `n` top sentences that match
     the query, ranked according to idf. If there are ties, preference should
     be given to sentences that have a higher query term density.
     """
-    
-    # Create an empty list to store sentences along with their associated IDF sum and query term density.
-    sentence_values = []
-    
-    # Iterate over each sentence and its associated words
-    for sentence, words in sentences.items():
-        # Compute the sum of IDF values for each word in the query that also appears in the sentence
-        idf_sum = sum(idfs[word] for word in query if word in words)
-        
-        # Compute the query term density which is the proportion of words in the sentence that are also in the query
-        query_term_density = sum(word in query for word in words) / len(words)
-        
-        # Append a tuple containing the sentence, its IDF sum and its query term density to our list
-        sentence_values.append((sentence, idf_sum, query_term_density))
-
-    # Sort our list of tuples in descending order first by IDF sum and then by query term density
-    sentence_values.sort(key=lambda x: (x[1], x[2]), reverse=True)
-    
-    # Return the 'n' top sentences. If there are fewer than 'n' sentences, it will return all sentences
-    return [sentence[0] for sentence in sentence_values[:n]]
+
+    vocabulary = sentences["vocabulary"]
+
+    # An indicator vector of the query words, and the same words weighted by idf
+    indicator = np.zeros(len(vocabulary))
+    weights = np.zeros(len(vocabulary))
+    for word in query:
+        if word in vocabulary:
+            indicator[vocabulary[word]] = 1
+            if word in idfs:
+                weights[vocabulary[word]] = idfs[word]
+
+    # Sum the idf of each query word that appears in a sentence, counting it once however often it appears
+    idf_sums = sentences["presence"] @ weights
+
+    # The query term density is the proportion of words in the sentence that are also in the query
+    densities = (sentences["counts"] @ indicator) / sentences["lengths"]
+
+    # Rank in descending order first by IDF sum and then by query term density
+    # If there are fewer than 'n' sentences, this will return all sentences
+    return [sentences["names"][i] for i in top_indices(n, idf_sums, densities)]
+
+
+def top_indices(n, *keys):
+    """
+    Given `n` and one or more arrays of `keys` (most significant first),
+    return the indices of the `n` rows with the largest keys, in descending
+    order. Ties keep the earlier row first.
+    """
+
+    primary = keys[0]
+    rows = np.arange(len(primary))
+
+    # Find the n-th largest primary key with a linear-time partition, and keep
+    # only the rows reaching it; every row tied at the cutoff stays a candidate
+    if 0 < n < len(primary):
+        cutoff = np.partition(primary, len(primary) - n)[len(primary) - n]
+        rows = np.flatnonzero(primary >= cutoff)
+
+    # Stable sort of just the candidates; lexsort treats its last key as primary
+    order = np.lexsort([-key[rows] for key in reversed(keys)])
+    return rows[order[:n]]
 
 if __name__ == "__main__":
     main()
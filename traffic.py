@@ -4,8 +4,9 @@ import os
 import sys
 import tensorflow as tf
 
-from sklearn.model_selection import train_test_split
+from concurrent.futures import ThreadPoolExecutor
 
+BATCH_SIZE = 32
 EPOCHS = 10
 IMG_WIDTH = 30
 IMG_HEIGHT = 30
@@ -19,23 +20,29 @@ def main():
     if len(sys.argv) not in [2, 3]:
         sys.exit("Usage: python traffic.py data_directory [model.h5]")
 
-    # Get image arrays and labels for all image files
-    images, labels = load_data(sys.argv[1])
+    # On a GPU, compute in float16 where it is numerically safe, keeping
+    # float32 weights (CPUs have no fast float16 path, so stay in float32 there)
+    if tf.config.list_physical_devices("GPU"):
+        tf.keras.mixed_precision.set_global_policy("mixed_float16")
 
-    # Split data into training and testing sets
-    labels = tf.keras.utils.to_categorical(labels)
-    x_train, x_test, y_train, y_test = train_test_split(
-        np.array(images), np.array(labels), test_size=TEST_SIZE
-    )
+    # Get image paths and labels for all image files
+    paths, labels = load_paths(sys.argv[1])
+    paths, labels = np.array(paths), np.array(labels)
+
+    # Split data into training and testing sets by shuffling indices once,
+    # then selecting each set's paths and labels with them
+    indices = np.random.permutation(len(paths))
+    split = int((1 - TEST_SIZE) * len(indices))
+    train, test = indices[:split], indices[split:]
 
     # Get a compiled neural network
     model = get_model()
 
-    # Fit model on training data
-    model.fit(x_train, y_train, epochs=EPOCHS)
+    # Fit model on training data, reading images as they are needed
+    model.fit(make_dataset(paths[train], labels[train], shuffle=True), epochs=EPOCHS)
 
     # Evaluate neural network performance
-    model.evaluate(x_test,  y_test, verbose=2)
+    model.evaluate(make_dataset(paths[test], labels[test]), verbose=2)
 
     # Save model to file
     if len(sys.argv) == 3:
@@ -59,30 +66,85 @@ def load_data(data_dir):
     corresponding `images`.
     """
     
-    # Initialize lists for storing image data and labels
-    images = []
+    # Read every image file listed in the subdirectories of `data_dir`,
+    # concurrently since OpenCV releases the GIL while reading and decoding
+    paths, labels = load_paths(data_dir)
+    with ThreadPoolExecutor() as executor:
+        images = list(executor.map(load_image, paths))
+
+    # Return the image data and labels
+    return images, labels
+
+
+def load_paths(data_dir):
+    """
+    Return tuple `(paths, labels)` listing the image files in `data_dir`,
+    laid out as described in `load_data`, and the integer label of each.
+    """
+    
+    # Initialize lists for storing image paths and labels
+    paths = []
     labels = []
 
-    # Iterate over the subdirectories in `data_dir`
-    for folder in os.listdir(data_dir):
-        folder_path = os.path.join(data_dir, folder)
+    # Iterate over the subdirectories in `data_dir`, whose entries already
+    # know their full path and whether they are directories without extra stats
+    with os.scandir(data_dir) as folders:
+        for folder in folders:
 
-        # Check if the current folder is a directory
-        if os.path.isdir(folder_path):
+            # Check if the current folder is a directory
+            if folder.is_dir():
 
-            # Iterate over the images in the subdirectory
-            for image_file in os.listdir(folder_path):
+                # Record the path of each image and its label (which is the folder name)
+                with os.scandir(folder.path) as image_files:
+                    for image_file in image_files:
+                        paths.append(image_file.path)
+                        labels.append(int(folder.name))
 
-                # Read the image file and resize it to IMG_WIDTH x IMG_HEIGHT
-                image = cv2.imread(os.path.join(folder_path, image_file), cv2.IMREAD_COLOR)
-                image = cv2.resize(image, (IMG_WIDTH, IMG_HEIGHT), interpolation=cv2.INTER_AREA)
+    return paths, labels
 
-                # Append the image data and its label (which is the folder name)
-                images.append(image)
-                labels.append(int(folder))
 
-    # Return the image data and labels
-    return images, labels
+def load_image(path):
+    """
+    Read the image file at `path` and return it resized to
+    IMG_WIDTH x IMG_HEIGHT x 3.
+    """
+    
+    # Paths arrive as bytes when called from a tf.data pipeline
+    path = os.fsdecode(path)
+
+    # JPEGs can be decoded straight at half scale, skipping most of the IDCT
+    # work, as long as enough pixels are left for the final resize
+    if path.lower().endswith((".jpg", ".jpeg")):
+        image = cv2.imread(path, cv2.IMREAD_REDUCED_COLOR_2)
+        if image.shape[0] >= IMG_HEIGHT and image.shape[1] >= IMG_WIDTH:
+            return cv2.resize(image, (IMG_WIDTH, IMG_HEIGHT), interpolation=cv2.INTER_AREA)
+
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    return cv2.resize(image, (IMG_WIDTH, IMG_HEIGHT), interpolation=cv2.INTER_AREA)
+
+
+def make_dataset(paths, labels, shuffle=False):
+    """
+    Return a batched `tf.data.Dataset` of the images at `paths` with their
+    one-hot encoded `labels`, optionally shuffled. Images are read and
+    resized in parallel as batches are requested, rather than all up front.
+    """
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if shuffle:
+        dataset = dataset.shuffle(len(paths))
+
+    def load(path, label):
+        # OpenCV decodes formats tf.io cannot, such as the dataset's .ppm files
+        image = tf.numpy_function(load_image, [path], tf.uint8)
+        image.set_shape((IMG_HEIGHT, IMG_WIDTH, 3))
+        return image, tf.one_hot(label, NUM_CATEGORIES)
+
+    return (
+        dataset
+        .map(load, num_parallel_calls=tf.data.AUTOTUNE)
+        .batch(BATCH_SIZE)
+        .prefetch(tf.data.AUTOTUNE)
+    )
 
 def get_model():
     """
@@ -93,10 +155,13 @@ def get_model():
     
     # Create a sequential model
     model = tf.keras.models.Sequential([
-        # Add a 2D convolution layer with 32 filters of size (3,3), relu activation function 
-        # and appropriate input shape
+        # Scale the uint8 pixel values to [0, 1] inside the model, with the
+        # appropriate input shape, so images can be fed as uint8
+        tf.keras.layers.Rescaling(1. / 255, input_shape=(IMG_WIDTH, IMG_HEIGHT, 3)),
+
+        # Add a 2D convolution layer with 32 filters of size (3,3) and relu activation function
         tf.keras.layers.Conv2D(
-            32, (3, 3), activation="relu", input_shape=(IMG_WIDTH, IMG_HEIGHT, 3)
+            32, (3, 3), activation="relu"
         ),
 
         # Add a MaxPooling layer with pool size (2,2) 
@@ -123,8 +188,9 @@ def get_model():
         tf.keras.layers.Dropout(0.33),
 
         # Add output Dense layer with NUM_CATEGORIES neurons (each for one category) 
-        # with softmax activation function for multiclass classification
-        tf.keras.layers.Dense(NUM_CATEGORIES, activation="softmax")
+        # with softmax activation function for multiclass classification,
+        # computed in float32 so the softmax stays numerically stable
+        tf.keras.layers.Dense(NUM_CATEGORIES, activation="softmax", dtype="float32")
     ])
 
     # Compile the model with Adam optimizer and categorical cross entropy as loss function 